@@ -1,10 +1,16 @@
+import asyncio
+import io
 import logging
-from pathlib import Path
-from tempfile import TemporaryDirectory
-from typing import List
+import multiprocessing
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Tuple
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
+    AIORateLimiter,
     Application,
     CommandHandler,
     MessageHandler,
@@ -13,11 +19,16 @@ from telegram.ext import (
     filters,
 )
 
-from utils.config import get_token, TELEGRAM_MAX_MSG
+from utils import workers
+from utils.config import get_token, TELEGRAM_MAX_MSG, WORKERS
 from utils.i18n import I18N, t, get_user_lang, USER_LANG
-from utils.asr_translate import transcribe_file, translate_text, flag_for_lang
-from utils.emotions import detect_emotions, format_emotions
-from utils.asr_translate import detect_lang_text, translate_text
+from utils.asr_translate import flag_for_lang
+from utils.emotions import format_emotions
+from utils.asr_translate import detect_lang_text
+from utils.batching import MicroBatcher, length_bucket
+
+# GoEmotions settings used by both handlers (batcher key)
+EMOTION_PARAMS = (3, 0.30)  # (top_k, threshold)
 
 
 class BotApp:
@@ -28,7 +39,32 @@ class BotApp:
 
     def __init__(self) -> None:
         self.token = get_token()
-        self.app: Application = Application.builder().token(self.token).build()
+        self.app: Application = (
+            Application.builder()
+            .token(self.token)
+            .post_init(self._post_init)
+            .post_shutdown(self._post_shutdown)
+            .concurrent_updates(True)
+            # Replies are sent concurrently; stay under Telegram's flood limits
+            .rate_limiter(AIORateLimiter())
+            .build()
+        )
+        # Model workers: ASR/translation/emotions run outside the event loop
+        self.pool = self._new_pool()
+        # Start every worker now so models load and warm up in the background
+        # (the pool spawns one process per task); checked in _post_init
+        self._warmup = [self.pool.submit(workers.ping) for _ in range(WORKERS)]
+        # Micro-batchers: concurrent requests share one model forward pass
+        self.translator = MicroBatcher(
+            workers.translate_batch, executor=self.pool, max_in_flight=WORKERS
+        )
+        self.emotions = MicroBatcher(
+            workers.emotions_batch, executor=self.pool, max_in_flight=WORKERS
+        )
+        # Updates are handled concurrently; this keeps each chat in order
+        # (locks are dropped when no handler holds or waits for them)
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+        self._chat_lock_users: Dict[int, int] = {}
         self._setup_logging()
         self._register_handlers()
 
@@ -67,21 +103,146 @@ class BotApp:
         # Errors
         self.app.add_error_handler(self.error_handler)
 
+    @staticmethod
+    def _new_pool() -> ProcessPoolExecutor:
+        # spawn: never fork a process that already runs threads/asyncio
+        return ProcessPoolExecutor(
+            max_workers=WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=workers.init_worker,
+        )
+
+    def _restart_pool(self, broken: ProcessPoolExecutor) -> None:
+        """Replace a broken pool (e.g. a worker was killed) once."""
+        if self.pool is not broken:
+            return  # already replaced by another handler
+        self.logger.error("Model worker pool is broken; restarting it")
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.pool = self._new_pool()
+        self.translator.executor = self.pool
+        self.emotions.executor = self.pool
+
+    async def _post_init(self, app: Application) -> None:
+        # Fail at startup (not on every voice note) if the workers cannot
+        # load the models, e.g. a model download error
+        try:
+            await asyncio.gather(*(asyncio.wrap_future(f) for f in self._warmup))
+        except BrokenProcessPool as exc:
+            raise RuntimeError(
+                "Model workers failed to start; see the worker traceback above."
+            ) from exc
+        # Build the Lingua detector now, not on the first text message
+        detect_lang_text("hello world")
+        self.translator.start()
+        self.emotions.start()
+
+    async def _post_shutdown(self, app: Application) -> None:
+        await self.translator.stop()
+        await self.emotions.stop()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
     # ---------- Utilities ----------
+    async def _translate(self, lang: str, text: str) -> Tuple[str, str]:
+        """Batched translation; returns (original, "same") on failure."""
+        pool = self.pool
+        try:
+            # Key on (direction, length bucket): batches only pad within a bucket
+            return await self.translator.submit((lang, length_bucket(text)), text)
+        except Exception as exc:
+            self.logger.exception("Translation failed")
+            if isinstance(exc, BrokenProcessPool):
+                self._restart_pool(pool)
+            return text, "same"
+
+    async def _detect_emotions(self, text: str) -> List[Tuple[int, float]]:
+        """
+        Batched emotion detection; returns (label_id, score) pairs.
+        Returns [] (shown as neutral) on failure.
+        """
+        if not text:
+            return []
+        pool = self.pool
+        try:
+            return await self.emotions.submit(
+                (EMOTION_PARAMS, length_bucket(text)), text)
+        except Exception as exc:
+            self.logger.exception("Emotion detection failed")
+            if isinstance(exc, BrokenProcessPool):
+                self._restart_pool(pool)
+            return []
+
+    async def _transcribe(self, audio: bytes) -> Tuple[str, str, float]:
+        """
+        Transcribe in the pool. A broken pool is restarted, but the audio is
+        not retried (it may be what killed the worker): returns empty text.
+        """
+        pool = self.pool
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                pool, workers.transcribe, audio)
+        except BrokenProcessPool:
+            self.logger.exception("Transcription failed")
+            self._restart_pool(pool)
+            return "", "unknown", 0.0
+
+    @asynccontextmanager
+    async def _chat_lock(self, chat_id: int) -> AsyncIterator[None]:
+        """Serialize handlers per chat without keeping a lock per chat forever."""
+        lock = self._chat_locks.get(chat_id)
+        if lock is None:
+            lock = self._chat_locks[chat_id] = asyncio.Lock()
+        self._chat_lock_users[chat_id] = self._chat_lock_users.get(chat_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._chat_lock_users[chat_id] -= 1
+            if not self._chat_lock_users[chat_id]:
+                del self._chat_lock_users[chat_id]
+                del self._chat_locks[chat_id]
+
+    @staticmethod
+    async def _reply_in_order(msg, texts: List[str]) -> None:
+        """Send replies one after another (Telegram shows them in send order)."""
+        for text in texts:
+            await msg.reply_text(text)
+
     @staticmethod
     def _split_telegram_message(text: str, limit: int = TELEGRAM_MAX_MSG) -> List[str]:
-        """Split long text for Telegram."""
+        """
+        Split long text for Telegram, preferring newline, then space breaks.
+        Break positions are collected in one pass and looked up with bisect.
+        """
+        n = len(text)
+        if n <= limit:
+            return [text] if text else []
+
+        breaks = {}
+        for ch in ("\n", " "):
+            found = []
+            i = text.find(ch)
+            while i != -1:
+                found.append(i)
+                i = text.find(ch, i + 1)
+            breaks[ch] = found
+
         parts = []
-        while len(text) > limit:
-            cut = text.rfind("\n", 0, limit)
-            if cut == -1:
-                cut = text.rfind(" ", 0, limit)
-            if cut == -1:
-                cut = limit
-            parts.append(text[:cut])
-            text = text[cut:].lstrip()
-        if text:
-            parts.append(text)
+        offset = 0
+        while n - offset > limit:
+            end = offset + limit
+            cut = end
+            for ch in ("\n", " "):
+                found = breaks[ch]
+                j = bisect_left(found, end) - 1
+                if j >= 0 and found[j] >= offset:
+                    cut = found[j]
+                    break
+            parts.append(text[offset:cut])
+            offset = cut
+            while offset < n and text[offset].isspace():
+                offset += 1
+        if offset < n:
+            parts.append(text[offset:])
         return parts
 
     # ---------- Command handlers ----------
@@ -138,16 +299,19 @@ class BotApp:
     # ---------- Voice handler ----------
 
     async def on_voice(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        async with self._chat_lock(update.effective_chat.id):
+            await self._process_voice(update, context)
+
+    async def _process_voice(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         msg = update.message
         user = update.effective_user
         file_id = msg.voice.file_id
         tg_file = await context.bot.get_file(file_id)
 
-        # Download voice note to a temp file
-        with TemporaryDirectory() as td:
-            audio_path = Path(td) / "audio.ogg"
-            await tg_file.download_to_drive(str(audio_path))
-            text, lang, prob = transcribe_file(audio_path)
+        # Download voice note into memory (no temp file round-trip)
+        buf = io.BytesIO()
+        await tg_file.download_to_memory(buf)
+        text, lang, prob = await self._transcribe(buf.getvalue())
 
         if not text:
             await msg.reply_text(
@@ -160,7 +324,7 @@ class BotApp:
         user_lang_ui = get_user_lang(user.id, user.language_code)
 
         # 1) Translate first (en<->es depending on detected speech lang)
-        translated, target_lang = translate_text(lang, text)
+        translated, target_lang = await self._translate(lang, text)
 
         # 2) Choose which text to feed into GoEmotions (expects English)
         if target_lang == "es":
@@ -174,7 +338,7 @@ class BotApp:
             emotion_text = text
 
         # 3) Detect emotions on the chosen text
-        emotions = detect_emotions(emotion_text, top_k=3, threshold=0.30)
+        emotions = await self._detect_emotions(emotion_text)
         emo_str = format_emotions(
             emotions, ui_lang=user_lang_ui) if emotions else "neutral 😐"
 
@@ -188,13 +352,11 @@ class BotApp:
             telegram_lang_code=user.language_code,
         )
         parts = self._split_telegram_message(text)
-        await msg.reply_text(header + parts[0])
-        for p in parts[1:]:
-            await msg.reply_text(p)
+        await self._reply_in_order(msg, [header + parts[0], *parts[1:]])
 
-        # 5) Send translation if applicable
+        # 5) Build translation messages if applicable
         if target_lang != "same" and translated:
-            flag_t = "🇬🇧" if target_lang == "en" else "🇪🇸" if target_lang == "es" else "🌐"
+            flag_t = flag_for_lang(target_lang)
             t_header = t(
                 user.id,
                 "translation_header",
@@ -204,22 +366,28 @@ class BotApp:
                 telegram_lang_code=user.language_code,
             )
             t_parts = self._split_telegram_message(translated)
-            await msg.reply_text(t_header + t_parts[0])
-            for p in t_parts[1:]:
-                await msg.reply_text(p)
+            t_msgs = [t_header + t_parts[0], *t_parts[1:]]
         else:
-            await msg.reply_text(
+            t_msgs = [
                 t(user.id, "translation_skipped",
                   telegram_lang_code=user.language_code)
-            )
+            ]
 
-        # 6) Send emotions summary
-        await msg.reply_text(
-            t(user.id, "emotion_header", emo=emo_str,
-              telegram_lang_code=user.language_code)
+        # 6) Translation (kept in order) and emotions summary are independent:
+        # send them concurrently
+        await asyncio.gather(
+            self._reply_in_order(msg, t_msgs),
+            msg.reply_text(
+                t(user.id, "emotion_header", emo=emo_str,
+                  telegram_lang_code=user.language_code)
+            ),
         )
 
     async def echo_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        async with self._chat_lock(update.effective_chat.id):
+            await self._process_text(update, context)
+
+    async def _process_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         msg = update.message
         user = update.effective_user
         text = msg.text
@@ -232,7 +400,7 @@ class BotApp:
             return
 
         # Translate between en <-> es
-        translated, target_lang = translate_text(detected_lang, text)
+        translated, target_lang = await self._translate(detected_lang, text)
 
         # Choose text for emotion detection (GoEmotions requires English)
         if detected_lang == "en":
@@ -244,12 +412,12 @@ class BotApp:
 
         # Detect emotions
         user_lang_ui = get_user_lang(user.id, user.language_code)
-        emotions = detect_emotions(emotion_text, top_k=3, threshold=0.30)
+        emotions = await self._detect_emotions(emotion_text)
         emo_str = format_emotions(
             emotions, ui_lang=user_lang_ui) if emotions else "neutral 😐"
 
         # 1) Show original text
-        flag_src = "🇬🇧" if detected_lang == "en" else "🇪🇸"
+        flag_src = flag_for_lang(detected_lang)
         header = t(
             user.id,
             "you_wrote",
@@ -259,9 +427,10 @@ class BotApp:
         )
         await msg.reply_text(f"{header}{text}")
 
-        # 2) Show translation if applicable
+        # 2) Show translation if applicable and 3) emotions, concurrently
+        sends = []
         if target_lang != "same" and translated:
-            flag_tgt = "🇬🇧" if target_lang == "en" else "🇪🇸"
+            flag_tgt = flag_for_lang(target_lang)
             t_header = t(
                 user.id,
                 "translation_header",
@@ -270,13 +439,14 @@ class BotApp:
                 tgt=target_lang,
                 telegram_lang_code=user.language_code,
             )
-            await msg.reply_text(f"{t_header}{translated}")
-
-        # 3) Show emotions
-        await msg.reply_text(
-            t(user.id, "emotion_header", emo=emo_str,
-              telegram_lang_code=user.language_code)
+            sends.append(msg.reply_text(f"{t_header}{translated}"))
+        sends.append(
+            msg.reply_text(
+                t(user.id, "emotion_header", emo=emo_str,
+                  telegram_lang_code=user.language_code)
+            )
         )
+        await asyncio.gather(*sends)
 
     async def unknown(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
@@ -0,0 +1,107 @@
+import asyncio
+import random
+import threading
+
+import pytest
+
+from utils.batching import MicroBatcher, length_bucket
+
+MODEL_DEPS = ("telegram", "torch", "transformers", "faster_whisper", "lingua")
+
+
+def _require_model_deps():
+    for dep in MODEL_DEPS:
+        pytest.importorskip(dep)
+
+
+def test_length_bucket():
+    assert length_bucket("hello") == 64
+    assert length_bucket("x" * 400) == 128
+    assert length_bucket("x" * 100_000) == 256
+
+
+def test_micro_batcher_groups_by_key():
+    calls = []
+
+    def batch_fn(key, items):
+        calls.append((key, list(items)))
+        return [f"{key}:{item}" for item in items]
+
+    async def run():
+        batcher = MicroBatcher(batch_fn)
+        batcher.start()
+        try:
+            return await asyncio.gather(
+                batcher.submit("en", "a"),
+                batcher.submit("en", "b"),
+                batcher.submit("es", "c"),
+                batcher.submit("en", "a"),
+            )
+        finally:
+            await batcher.stop()
+
+    assert asyncio.run(run()) == ["en:a", "en:b", "es:c", "en:a"]
+    assert sorted(calls) == [("en", ["a", "b"]), ("es", ["c"])]
+
+
+def test_micro_batcher_runs_groups_concurrently():
+    # Both groups must be inside batch_fn at the same time to pass the barrier
+    barrier = threading.Barrier(2, timeout=5)
+
+    def batch_fn(key, items):
+        barrier.wait()
+        return items
+
+    async def run():
+        batcher = MicroBatcher(batch_fn, max_in_flight=2)
+        batcher.start()
+        try:
+            return await asyncio.gather(
+                batcher.submit("en", "a"), batcher.submit("es", "b")
+            )
+        finally:
+            await batcher.stop()
+
+    assert asyncio.run(run()) == ["a", "b"]
+
+
+def _split_rfind(text, limit):
+    # The splitter before the single-scan rewrite, kept as the reference
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut == -1:
+            cut = text.rfind(" ", 0, limit)
+        if cut == -1:
+            cut = limit
+        parts.append(text[:cut])
+        text = text[cut:].lstrip()
+    if text:
+        parts.append(text)
+    return parts
+
+
+def test_split_telegram_message_matches_reference():
+    _require_model_deps()
+    from bot import BotApp
+
+    rng = random.Random(0)
+    for _ in range(5000):
+        text = "".join(rng.choice("ab \n\tx") for _ in range(rng.randint(0, 200)))
+        limit = rng.randint(1, 30)
+        assert BotApp._split_telegram_message(text, limit) == _split_rfind(text, limit)
+
+
+def test_detect_lang_text_spanish_name_in_english():
+    _require_model_deps()
+    from utils.asr_translate import detect_lang_text
+
+    assert detect_lang_text("I met María yesterday at the park") == "en"
+    assert detect_lang_text("¿Dónde está la estación?") == "es"
+
+
+def test_bot_imports():
+    _require_model_deps()
+    import bot
+
+    assert hasattr(bot, "BotApp")
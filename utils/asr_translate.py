@@ -1,9 +1,51 @@
-from typing import Tuple
+import functools
+from typing import List, Tuple
+import numpy as np
+import torch
 from faster_whisper import WhisperModel
 from transformers import MarianMTModel, MarianTokenizer
-from langdetect import detect, DetectorFactory
 from lingua import Language, LanguageDetectorBuilder
-DetectorFactory.seed = 0  # deterministic results
+from utils.config import ASR_BEAM_SIZE, ASR_DEVICE, ASR_MODEL
+from utils.inference import prepare_model
+
+# --- Lingua detector (en/es only, built once on first use) ---
+# Lazy: the model workers import this module but never detect text
+_LINGUA_LANGS = (Language.ENGLISH, Language.SPANISH)
+_LINGUA = None
+
+
+def _lingua():
+    """Return the shared Lingua detector, building it on the first call."""
+    global _LINGUA
+    if _LINGUA is None:
+        _LINGUA = (
+            LanguageDetectorBuilder.from_languages(*_LINGUA_LANGS)
+            .with_preloaded_language_models()
+            .build()
+        )
+    return _LINGUA
+
+
+# Inverted punctuation only Spanish uses. Accented letters are not enough:
+# English text often carries Spanish names and words (María, jalapeños).
+_SPANISH_MARKERS = frozenset("¿¡")
+
+
+def _detect_langdetect(text: str) -> str:
+    """
+    Fallback detector (langdetect), imported only when Lingua fails.
+    """
+    try:
+        from langdetect import detect, DetectorFactory
+        DetectorFactory.seed = 0  # deterministic results
+        code = (detect(text) or "").lower()
+        if code.startswith("en"):
+            return "en"
+        if code.startswith("es"):
+            return "es"
+        return "other"
+    except Exception:
+        return "other"
 
 
 def detect_lang_text(text: str) -> str:
@@ -13,73 +55,110 @@ def detect_lang_text(text: str) -> str:
     """
     if not text or not text.strip():
         return "other"
+    key = text.strip().lower()
+    # Fast path: ¿/¡ mark Spanish without asking Lingua
+    if not _SPANISH_MARKERS.isdisjoint(key):
+        return "es"
+    return _detect_cached(key)
 
-    # 1) Try Lingua (recommended)
-    try:
-
-        detector = LanguageDetectorBuilder.from_languages(
-            Language.ENGLISH, Language.SPANISH
-        ).build()
 
+@functools.lru_cache(maxsize=2048)
+def _detect_cached(text: str) -> str:
+    # 1) Lingua (recommended)
+    detector = _lingua()
+    try:
         lang = detector.detect_language_of(text)
-        if lang == Language.ENGLISH:
-            return "en"
-        if lang == Language.SPANISH:
-            return "es"
-
-        # Optional: confidence-based decision
-        confidences = detector.compute_language_confidence_values(
-            text)  # list of ConfidenceValue
-        if confidences:
-            best = max(confidences, key=lambda c: c.value)
-            if best.value >= 0.70:  # tighten threshold for short/noisy texts
-                if best.language == Language.ENGLISH:
-                    return "en"
-                if best.language == Language.SPANISH:
-                    return "es"
-        return "other"
-
     except Exception:
-        # 2) Fallback to langdetect if Lingua is unavailable
-        try:
-            code = (detect(text) or "").lower()
-            if code.startswith("en"):
+        # 2) Fallback to langdetect if Lingua fails on this input
+        return _detect_langdetect(text)
+
+    if lang == Language.ENGLISH:
+        return "en"
+    if lang == Language.SPANISH:
+        return "es"
+
+    # Ambiguous only: confidence-based decision
+    confidences = detector.compute_language_confidence_values(
+        text)  # list of ConfidenceValue
+    if confidences:
+        best = max(confidences, key=lambda c: c.value)
+        if best.value >= 0.70:  # tighten threshold for short/noisy texts
+            if best.language == Language.ENGLISH:
                 return "en"
-            if code.startswith("es"):
+            if best.language == Language.SPANISH:
                 return "es"
-            return "other"
-        except Exception:
-            return "other"
-
+    return "other"
 
-# --- Whisper model (loaded once) ---
-# Adjust device/compute if you have GPU: device="cuda", compute_type="float16"
-_whisper = WhisperModel("small", device="cpu", compute_type="int8")
 
-# --- MarianMT models (loaded once) ---
+# --- Model names ---
 _EN_ES_MODEL = "Helsinki-NLP/opus-mt-en-es"
 _ES_EN_MODEL = "Helsinki-NLP/opus-mt-es-en"
+_MT_MAX_TOKENS = 256  # input truncation and output cap
+
+# Reusable MarianMT input buffers (rows = micro-batch size, grown on demand)
+_IN_BUF = torch.zeros(8, _MT_MAX_TOKENS, dtype=torch.long)
+_ATTN_BUF = torch.zeros(8, _MT_MAX_TOKENS, dtype=torch.long)
+
+# Flag emoji per 2-letter language code
+_FLAG_FROM_LANG = {"en": "🇬🇧", "es": "🇪🇸"}
+
+# --- Whisper + MarianMT models (loaded lazily, once per process) ---
+_whisper = None
+_tok_en_es = _mod_en_es = None
+_tok_es_en = _mod_es_en = None
+
+
+def load_models() -> None:
+    """
+    Load Whisper and both MarianMT models into this process (no-op if loaded).
+    Called by the process-pool initializer so the bot process itself stays light.
+    """
+    global _whisper, _tok_en_es, _mod_en_es, _tok_es_en, _mod_es_en
+    if _whisper is not None:
+        return
+    # GPU (float16) when available, otherwise CPU int8; "auto" is resolved in config
+    compute_type = "float16" if ASR_DEVICE == "cuda" else "int8"
+    _whisper = WhisperModel(ASR_MODEL, device=ASR_DEVICE, compute_type=compute_type)
+
+    # MarianMT, int8-quantized if QUANTIZE_INT8=1
+    _tok_en_es = MarianTokenizer.from_pretrained(_EN_ES_MODEL)
+    _mod_en_es = prepare_model(MarianMTModel.from_pretrained(_EN_ES_MODEL))
 
-_tok_en_es = MarianTokenizer.from_pretrained(_EN_ES_MODEL)
-_mod_en_es = MarianMTModel.from_pretrained(_EN_ES_MODEL)
+    _tok_es_en = MarianTokenizer.from_pretrained(_ES_EN_MODEL)
+    _mod_es_en = prepare_model(MarianMTModel.from_pretrained(_ES_EN_MODEL))
 
-_tok_es_en = MarianTokenizer.from_pretrained(_ES_EN_MODEL)
-_mod_es_en = MarianMTModel.from_pretrained(_ES_EN_MODEL)
 
+def warmup() -> None:
+    """
+    Run a tiny input through Whisper and both MarianMT models so lazy kernel
+    and tokenizer initialization happens before the first real request.
+    """
+    load_models()
+    segments, _ = _whisper.transcribe(
+        np.zeros(16000, dtype=np.float32), language="en", beam_size=1
+    )
+    list(segments)  # segments are decoded lazily
+    translate_batch("en", ["hello"])
+    translate_batch("es", ["hola"])
 
-def transcribe_file(file_path) -> Tuple[str, str, float]:
+
+def transcribe_file(audio) -> Tuple[str, str, float]:
     """
-    Transcribe an audio file with automatic language detection.
+    Transcribe audio (file path or binary file-like object) with automatic
+    language detection.
     Returns (text, lang_code, confidence).
     """
+    load_models()
     segments, info = _whisper.transcribe(
-        str(file_path),
+        audio if hasattr(audio, "read") else str(audio),
         language=None,  # auto-detect
         vad_filter=True,
-        beam_size=5,
+        vad_parameters=dict(min_silence_duration_ms=500),
+        beam_size=ASR_BEAM_SIZE,
+        best_of=ASR_BEAM_SIZE,
     )
-    text = " ".join(seg.text.strip()
-                    for seg in segments if getattr(seg, "text", None))
+    # Segments are decoded lazily as this loop consumes them
+    text = " ".join([seg.text.strip() for seg in segments if seg.text])
     return (
         text.strip(),
         (info.language or "unknown"),
@@ -87,39 +166,57 @@ def transcribe_file(file_path) -> Tuple[str, str, float]:
     )
 
 
-def translate_text(detected_lang: str, text: str) -> tuple[str, str]:
+def _encode_into_buffers(tok, texts: List[str]) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Tokenize texts into the persistent input/attention buffers (right padded).
+    Returns views of the buffers sized to the batch; they are overwritten by
+    the next call, so this is not thread-safe (one call at a time per process).
+    """
+    global _IN_BUF, _ATTN_BUF
+    ids = tok(texts, truncation=True, max_length=_MT_MAX_TOKENS)["input_ids"]
+    n, length = len(ids), max(len(x) for x in ids)
+    if n > _IN_BUF.shape[0]:
+        _IN_BUF = torch.zeros(n, _MT_MAX_TOKENS, dtype=torch.long)
+        _ATTN_BUF = torch.zeros(n, _MT_MAX_TOKENS, dtype=torch.long)
+
+    input_ids = _IN_BUF[:n, :length]
+    attention_mask = _ATTN_BUF[:n, :length]
+    input_ids.fill_(tok.pad_token_id)
+    attention_mask.zero_()
+    for row, x in enumerate(ids):
+        input_ids[row, :len(x)].copy_(torch.as_tensor(x))
+        attention_mask[row, :len(x)] = 1
+    return input_ids, attention_mask
+
+
+def translate_batch(detected_lang: str, texts: List[str]) -> List[Tuple[str, str]]:
     """
-    Translate en→es or es→en based on detected language.
-    Returns (translated_text, target_lang) or (original, "same") if not es/en.
+    Translate several texts in the same direction with a single generate call.
+    Returns one (translated_text, target_lang) per input; texts that are not
+    es/en come back unchanged with "same". Model errors are raised to the caller.
     """
-    if not text:
-        return "", "same"
+    load_models()
     code = (detected_lang or "").lower()
-    try:
-        if code.startswith("en"):
-            tok, model, target = _tok_en_es, _mod_en_es, "es"
-        elif code.startswith("es"):
-            tok, model, target = _tok_es_en, _mod_es_en, "en"
-        else:
-            return text, "same"
-
-        inputs = tok([text], return_tensors="pt",
-                     padding=True, truncation=True)
-        gen = model.generate(**inputs, max_new_tokens=512)
-        out = tok.batch_decode(gen, skip_special_tokens=True)[0]
-        return out.strip(), target
-    except Exception:
-        # If translation fails, return original text
-        return text, "same"
+    if code.startswith("en"):
+        tok, model, target = _tok_en_es, _mod_en_es, "es"
+    elif code.startswith("es"):
+        tok, model, target = _tok_es_en, _mod_es_en, "en"
+    else:
+        return [(text, "same") for text in texts]
+
+    input_ids, attention_mask = _encode_into_buffers(
+        tok, [text.strip() for text in texts])
+    # Greedy decoding; output budget scales with the (padded) input length
+    max_new = min(_MT_MAX_TOKENS, int(input_ids.shape[1] * 1.3) + 16)
+    with torch.inference_mode():
+        gen = model.generate(input_ids=input_ids, attention_mask=attention_mask,
+                             max_new_tokens=max_new, num_beams=1, do_sample=False)
+    outs = tok.batch_decode(gen, skip_special_tokens=True)
+    return [(out.strip(), target) for out in outs]
 
 
 def flag_for_lang(code: str) -> str:
     """
     Return a flag emoji for language code.
     """
-    code = (code or "").lower()
-    if code.startswith("en"):
-        return "🇬🇧"
-    if code.startswith("es"):
-        return "🇪🇸"
-    return "🌐"
+    return _FLAG_FROM_LANG.get((code or "")[:2].lower(), "🌐")
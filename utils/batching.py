@@ -0,0 +1,152 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import Executor
+from contextlib import suppress
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+# batch_fn(key, items) -> one result per item, same order
+BatchFn = Callable[[Hashable, List[Any]], Sequence[Any]]
+
+
+# Approximate token-length buckets (MarianMT/RoBERTa average ~4 chars per token)
+LENGTH_BUCKETS = (64, 128, 256)
+CHARS_PER_TOKEN = 4
+
+
+def length_bucket(text: str, buckets: Sequence[int] = LENGTH_BUCKETS) -> int:
+    """
+    Return the smallest bucket that fits the estimated token length of text
+    (the largest bucket for anything longer). Used as part of the batch key so
+    a batch only pads within its bucket.
+    """
+    estimate = len(text) // CHARS_PER_TOKEN + 1
+    for size in buckets:
+        if estimate <= size:
+            return size
+    return buckets[-1]
+
+
+class MicroBatcher:
+    """
+    Collect concurrent requests for a short window and run them as one batch.
+    Requests are grouped by key (e.g. translation direction) and each group is
+    passed to batch_fn(key, items) in an executor, so the event loop stays free.
+    Up to max_in_flight groups run at once (size it to the executor's workers).
+    Completed results are kept in a small LRU; identical in-flight requests share
+    the same future.
+    """
+
+    def __init__(
+        self,
+        batch_fn: BatchFn,
+        max_batch: int = 8,
+        max_wait: float = 0.02,
+        cache_size: int = 2048,
+        executor: Optional[Executor] = None,
+        max_in_flight: int = 1,
+    ) -> None:
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.cache_size = cache_size
+        self.executor = executor
+        self.max_in_flight = max_in_flight
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight: Set[asyncio.Task] = set()
+        self._pending: Dict[Tuple[Hashable, Any], asyncio.Future] = {}
+        self._cache: "OrderedDict[Tuple[Hashable, Any], Any]" = OrderedDict()
+
+    def start(self) -> None:
+        """Start the worker task (must be called from the running event loop)."""
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._task = asyncio.create_task(self._worker())
+
+    async def stop(self) -> None:
+        """Cancel the worker task and any running groups."""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        for task in list(self._in_flight):
+            task.cancel()
+        await asyncio.gather(*self._in_flight, return_exceptions=True)
+        for fut in self._pending.values():
+            fut.cancel()
+        self._pending.clear()
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        """Queue one item and wait for its result."""
+        ck = (key, item)
+        if ck in self._cache:
+            self._cache.move_to_end(ck)
+            return self._cache[ck]
+        fut = self._pending.get(ck)
+        if fut is None:
+            fut = asyncio.get_running_loop().create_future()
+            self._pending[ck] = fut
+            self._queue.put_nowait(ck)
+        # Shield: a cancelled caller must not cancel a future shared with others
+        return await asyncio.shield(fut)
+
+    # ---------- Internals ----------
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(items) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            groups: Dict[Hashable, List[Any]] = {}
+            for key, item in items:
+                groups.setdefault(key, []).append(item)
+            # Dispatch groups without waiting for them, bounded by max_in_flight,
+            # so several executor workers can be busy at once
+            for key, group in groups.items():
+                await self._slots.acquire()
+                task = asyncio.create_task(self._run_group(loop, key, group))
+                self._in_flight.add(task)
+                task.add_done_callback(self._group_done)
+
+    def _group_done(self, task: asyncio.Task) -> None:
+        self._in_flight.discard(task)
+        self._slots.release()
+
+    async def _run_group(
+        self, loop: asyncio.AbstractEventLoop, key: Hashable, group: List[Any]
+    ) -> None:
+        try:
+            results = await loop.run_in_executor(
+                self.executor, self.batch_fn, key, group
+            )
+        except Exception as exc:
+            for item in group:
+                fut = self._pending.pop((key, item))
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+
+        for item, result in zip(group, results):
+            ck = (key, item)
+            self._remember(ck, result)
+            fut = self._pending.pop(ck)
+            if not fut.done():
+                fut.set_result(result)
+
+    def _remember(self, ck: Tuple[Hashable, Any], result: Any) -> None:
+        if self.cache_size <= 0:
+            return
+        self._cache[ck] = result
+        self._cache.move_to_end(ck)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -3,6 +3,38 @@ import os
 # Global Telegram text limit
 TELEGRAM_MAX_MSG = 4096
 
+# Int8 dynamic quantization of MarianMT/GoEmotions (set to "1" to enable;
+# off by default until translation quality is checked against FP32)
+QUANTIZE_INT8 = os.getenv("QUANTIZE_INT8", "0") == "1"
+
+# torch.compile MarianMT/GoEmotions forward (first calls pay JIT cost; see warmup).
+# Skipped when QUANTIZE_INT8=1: compiling int8-quantized models is not supported here.
+TORCH_COMPILE = os.getenv("TORCH_COMPILE", "0") == "1"
+
+# Whisper model (e.g. "small", "distil-large-v3"; "*.en" models are English-only)
+ASR_MODEL = os.getenv("ASR_MODEL", "small")
+# Whisper device: "auto" (CUDA if available), "cuda" or "cpu". Resolved here
+# because the default worker count depends on it.
+ASR_DEVICE = os.getenv("ASR_DEVICE", "auto")
+if ASR_DEVICE == "auto":
+    import ctranslate2  # installed with faster-whisper
+
+    ASR_DEVICE = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+
+# Whisper beam size / best_of (1 = greedy, 5 = slower but more accurate)
+ASR_BEAM_SIZE = int(os.getenv("ASR_BEAM_SIZE", "1"))
+
+# Model worker processes (each holds its own copy of every model). On CUDA
+# every worker would load Whisper onto the GPU, so default to a single one.
+WORKERS = int(os.getenv("WORKERS", "0")) or (
+    1 if ASR_DEVICE == "cuda" else max(1, (os.cpu_count() or 2) - 1)
+)
+
+# Torch intra-op threads per process (default: CPU cores split across workers)
+TORCH_THREADS = int(os.getenv("TORCH_THREADS", "0")) or max(
+    1, (os.cpu_count() or 1) // WORKERS
+)
+
 
 def get_token() -> str:
     """
@@ -1,143 +1,125 @@
 from typing import List, Tuple
+
+import numpy as np
+import torch
 from transformers import (
+    AutoConfig,
     AutoTokenizer,
     AutoModelForSequenceClassification,
-    TextClassificationPipeline,
 )
+from utils.inference import prepare_model
 
-# --- Emotion model (GoEmotions, loaded once) ---
+# --- Emotion model (GoEmotions, loaded lazily, once per process) ---
 _EMOTION_MODEL = "SamLowe/roberta-base-go_emotions"
-_emo_tokenizer = AutoTokenizer.from_pretrained(_EMOTION_MODEL)
-_emo_model = AutoModelForSequenceClassification.from_pretrained(_EMOTION_MODEL)
-_emotion_pipe = TextClassificationPipeline(
-    model=_emo_model,
-    tokenizer=_emo_tokenizer,
-    return_all_scores=True,
-    function_to_apply="sigmoid",  # multilabel
-)
+_EMO_MAX_TOKENS = 128
+_emo_tokenizer = None
+_emo_model = None
 
-# Emojis per GoEmotions label
-EMOJI_MAP = {
-    "admiration": "👏",
-    "amusement": "😄",
-    "anger": "😠",
-    "annoyance": "😒",
-    "approval": "👍",
-    "caring": "🤗",
-    "confusion": "😕",
-    "curiosity": "🤔",
-    "desire": "😍",
-    "disappointment": "😞",
-    "disapproval": "👎",
-    "disgust": "🤢",
-    "embarrassment": "😳",
-    "excitement": "🤩",
-    "fear": "😨",
-    "gratitude": "🙏",
-    "grief": "😢",
-    "joy": "😊",
-    "love": "❤️",
-    "nervousness": "😬",
-    "optimism": "🌤️",
-    "pride": "🦁",
-    "realization": "💡",
-    "relief": "😮‍💨",
-    "remorse": "😔",
-    "sadness": "😢",
-    "surprise": "😮",
-    "neutral": "😐",
-}
 
-# Labels ES/EN (mapped from GoEmotions' English keys)
-EMOTION_LABELS_ES = {
-    "admiration": "admiración",
-    "amusement": "diversión",
-    "anger": "ira",
-    "annoyance": "molestia",
-    "approval": "aprobación",
-    "caring": "afecto",
-    "confusion": "confusión",
-    "curiosity": "curiosidad",
-    "desire": "deseo",
-    "disappointment": "decepción",
-    "disapproval": "desaprobación",
-    "disgust": "asco",
-    "embarrassment": "vergüenza",
-    "excitement": "entusiasmo",
-    "fear": "temor",
-    "gratitude": "gratitud",
-    "grief": "duelo",
-    "joy": "alegría",
-    "love": "amor",
-    "nervousness": "nerviosismo",
-    "optimism": "optimismo",
-    "pride": "orgullo",
-    "realization": "revelación",
-    "relief": "alivio",
-    "remorse": "remordimiento",
-    "sadness": "tristeza",
-    "surprise": "sorpresa",
-    "neutral": "neutral",
-}
-EMOTION_LABELS_EN = {
-    "admiration": "admiration",
-    "amusement": "amusement",
-    "anger": "anger",
-    "annoyance": "annoyance",
-    "approval": "approval",
-    "caring": "caring",
-    "confusion": "confusion",
-    "curiosity": "curiosity",
-    "desire": "desire",
-    "disappointment": "disappointment",
-    "disapproval": "disapproval",
-    "disgust": "disgust",
-    "embarrassment": "embarrassment",
-    "excitement": "excitement",
-    "fear": "fear",
-    "gratitude": "gratitude",
-    "grief": "grief",
-    "joy": "joy",
-    "love": "love",
-    "nervousness": "nervousness",
-    "optimism": "optimism",
-    "pride": "pride",
-    "realization": "realization",
-    "relief": "relief",
-    "remorse": "remorse",
-    "sadness": "sadness",
-    "surprise": "surprise",
-    "neutral": "neutral",
+def load_models() -> None:
+    """
+    Load the GoEmotions model into this process (no-op if loaded).
+    """
+    global _emo_tokenizer, _emo_model
+    if _emo_model is not None:
+        return
+    _emo_tokenizer = AutoTokenizer.from_pretrained(_EMOTION_MODEL)
+    # int8-quantized if QUANTIZE_INT8=1
+    _emo_model = prepare_model(
+        AutoModelForSequenceClassification.from_pretrained(_EMOTION_MODEL)
+    )
+
+
+def warmup() -> None:
+    """
+    Run a tiny input through the GoEmotions model (first-call initialization).
+    """
+    detect_emotions_batch(["hello"], top_k=1, threshold=0.0)
+
+
+# Spanish name and emoji per GoEmotions label (English key)
+_EMOTION_NAMES = {
+    "admiration": ("admiración", "👏"),
+    "amusement": ("diversión", "😄"),
+    "anger": ("ira", "😠"),
+    "annoyance": ("molestia", "😒"),
+    "approval": ("aprobación", "👍"),
+    "caring": ("afecto", "🤗"),
+    "confusion": ("confusión", "😕"),
+    "curiosity": ("curiosidad", "🤔"),
+    "desire": ("deseo", "😍"),
+    "disappointment": ("decepción", "😞"),
+    "disapproval": ("desaprobación", "👎"),
+    "disgust": ("asco", "🤢"),
+    "embarrassment": ("vergüenza", "😳"),
+    "excitement": ("entusiasmo", "🤩"),
+    "fear": ("temor", "😨"),
+    "gratitude": ("gratitud", "🙏"),
+    "grief": ("duelo", "😢"),
+    "joy": ("alegría", "😊"),
+    "love": ("amor", "❤️"),
+    "nervousness": ("nerviosismo", "😬"),
+    "optimism": ("optimismo", "🌤️"),
+    "pride": ("orgullo", "🦁"),
+    "realization": ("revelación", "💡"),
+    "relief": ("alivio", "😮‍💨"),
+    "remorse": ("remordimiento", "😔"),
+    "sadness": ("tristeza", "😢"),
+    "surprise": ("sorpresa", "😮"),
+    "neutral": ("neutral", "😐"),
 }
 
+# One row per model output index: (english, spanish, emoji).
+# Built from the model config alone, so formatting never needs the model loaded.
+_config = AutoConfig.from_pretrained(_EMOTION_MODEL)
+_LABEL_TABLE: List[Tuple[str, str, str]] = [
+    (name, *_EMOTION_NAMES.get(name, (name, "🎭")))
+    for name in (_config.id2label[i] for i in range(_config.num_labels))
+]
 
-def detect_emotions(
-    text: str, top_k: int = 3, threshold: float = 0.30
-) -> List[Tuple[str, float]]:
+
+def detect_emotions_batch(
+    texts: List[str], top_k: int = 3, threshold: float = 0.30
+) -> List[List[Tuple[int, float]]]:
     """
-    Detect emotions (multilabel). Return top-k labels above threshold (or top-1 fallback).
+    Detect emotions for several texts with a single forward pass.
+    Returns one list of (label_id, score) per input text.
     """
-    if not text:
-        return []
-    scores = _emotion_pipe(text)[0]
-    scores = sorted(scores, key=lambda x: x["score"], reverse=True)
-    picked = [
-        (s["label"], float(s["score"])) for s in scores if s["score"] >= threshold
-    ]
-    if not picked:
-        picked = [(scores[0]["label"], float(scores[0]["score"]))]
-    return picked[:top_k]
+    load_models()
+    # Tokenized per batch, not cached per text: repeated texts are answered
+    # by MicroBatcher's result LRU in the bot process and never get here
+    enc = _emo_tokenizer(texts, return_tensors="pt", padding=True,
+                         truncation=True, max_length=_EMO_MAX_TOKENS)
+    with torch.inference_mode():
+        probs = torch.sigmoid(_emo_model(**enc).logits).cpu().numpy()  # multilabel
+
+    # Partial sort: top-k per row in O(n), then order only those k
+    k = max(1, min(top_k, probs.shape[-1]))
+    idx = np.argpartition(-probs, k - 1, axis=-1)[:, :k]
+    vals = np.take_along_axis(probs, idx, axis=-1)
+    order = np.argsort(-vals, axis=-1)
+    idx = np.take_along_axis(idx, order, axis=-1)
+    vals = np.take_along_axis(vals, order, axis=-1)
+
+    results = []
+    for row_idx, row_vals in zip(idx, vals):
+        keep = row_vals >= threshold
+        if keep.any():
+            results.append(
+                [(int(i), float(v)) for i, v in zip(row_idx[keep], row_vals[keep])])
+        else:
+            results.append([(int(row_idx[0]), float(row_vals[0]))])
+    return results
 
 
 def format_emotions(emolist, ui_lang: str) -> str:
     """
-    Format emotions using user's chosen UI language ("es" or "en").
+    Format (label_id, score) pairs using user's chosen UI language ("es" or "en").
     Example: "joy 😊 (0.91)" or "alegría 😊 (0.91)"
     """
-    labels = EMOTION_LABELS_ES if ui_lang == "es" else EMOTION_LABELS_EN
-    parts = []
-    for label, score in emolist:
-        text_label = labels.get(label, label)
-        emoji = EMOJI_MAP.get(label, "🎭")
-        parts.append(f"{text_label} {emoji} ({score:.2f})")
-    return ", ".join(parts)
+    j = 1 if ui_lang == "es" else 0
+    return ", ".join(
+        f"{row[j]} {row[2]} ({score:.2f})"
+        for i, score in emolist
+        for row in (_LABEL_TABLE[i],)
+    )
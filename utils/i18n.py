@@ -1,8 +1,12 @@
-from typing import Dict
+import functools
+from typing import Dict, Tuple
 
 # In-memory language preferences (POC). key: user_id -> "es" or "en"
 USER_LANG: Dict[int, str] = {}
 
+# Supported UI language per 2-letter Telegram language_code prefix
+_LANG_FROM_CODE = {"en": "en", "es": "es"}
+
 I18N = {
     "welcome": {
         "en": (
@@ -94,35 +98,32 @@ I18N = {
     },
 }
 
+# Flat (key, lang) -> template index, built once
+_TEMPLATES: Dict[Tuple[str, str], str] = {
+    (key, lang): tmpl for key, langs in I18N.items() for lang, tmpl in langs.items()
+}
+
 
 def t(user_id: int, key: str, **kwargs) -> str:
     """
     Resolve template by user language.
     Fallback order: user preference -> Telegram language_code -> English.
     """
-    lang_pref = USER_LANG.get(user_id)
-    if not lang_pref:
-        lang_code = (kwargs.pop("telegram_lang_code", "") or "").lower()
-        if lang_code.startswith("es"):
-            lang_pref = "es"
-        elif lang_code.startswith("en"):
-            lang_pref = "en"
-        else:
-            lang_pref = "en"
-    template = I18N.get(key, {}).get(
-        lang_pref) or I18N.get(key, {}).get("en", "")
-    return template.format(**kwargs)
+    lang_code = kwargs.pop("telegram_lang_code", "") or ""
+    lang_pref = USER_LANG.get(user_id) or _LANG_FROM_CODE.get(
+        lang_code[:2].lower(), "en")
+    return _render(key, lang_pref, tuple(sorted(kwargs.items())))
+
+
+@functools.lru_cache(maxsize=4096)
+def _render(key: str, lang: str, items: Tuple[Tuple[str, str], ...]) -> str:
+    template = _TEMPLATES.get((key, lang)) or _TEMPLATES.get((key, "en"), "")
+    return template.format(**dict(items))
 
 
 def get_user_lang(user_id: int, telegram_lang_code: str) -> str:
     """
     Resolve user's preferred UI language ("es" or "en").
     """
-    if user_id in USER_LANG:
-        return USER_LANG[user_id]
-    code = (telegram_lang_code or "").lower()
-    if code.startswith("es"):
-        return "es"
-    if code.startswith("en"):
-        return "en"
-    return "en"
+    return USER_LANG.get(user_id) or _LANG_FROM_CODE.get(
+        (telegram_lang_code or "")[:2].lower(), "en")
@@ -0,0 +1,30 @@
+import logging
+
+import torch
+
+from utils.config import QUANTIZE_INT8, TORCH_COMPILE, TORCH_THREADS
+
+torch.set_num_threads(TORCH_THREADS)
+
+logger = logging.getLogger(__name__)
+
+
+def prepare_model(model: torch.nn.Module) -> torch.nn.Module:
+    """
+    Put a Hugging Face model in eval mode and, if enabled, quantize its
+    Linear layers to int8 (dynamic quantization, CPU only) or compile its
+    forward with torch.compile (only without int8).
+    """
+    model.eval()
+    if QUANTIZE_INT8:
+        model = torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    if TORCH_COMPILE and QUANTIZE_INT8:
+        # torch.compile over dynamically quantized Linear is not verified
+        logger.warning("TORCH_COMPILE=1 needs QUANTIZE_INT8=0; skipping compile")
+    elif TORCH_COMPILE:
+        # Compile forward in place so model.generate() also uses it.
+        # Default mode: these models run on CPU, so no CUDA graphs.
+        model.forward = torch.compile(model.forward, dynamic=True)
+    return model
@@ -0,0 +1,39 @@
+"""
+Process-pool entry points. Top-level functions so they can be pickled;
+each worker process loads its own copy of the models at startup.
+"""
+import io
+from typing import List, Tuple
+
+from utils import asr_translate, emotions
+
+
+def init_worker() -> None:
+    """Pool initializer: load and warm up every model once in the child process."""
+    asr_translate.load_models()
+    emotions.load_models()
+    asr_translate.warmup()
+    emotions.warmup()
+
+
+def ping() -> bool:
+    """No-op task; submitting it makes the pool start (and warm up) a worker."""
+    return True
+
+
+def transcribe(audio: bytes) -> Tuple[str, str, float]:
+    return asr_translate.transcribe_file(io.BytesIO(audio))
+
+
+def translate_batch(
+    key: Tuple[str, int], texts: List[str]
+) -> List[Tuple[str, str]]:
+    detected_lang, _bucket = key
+    return asr_translate.translate_batch(detected_lang, texts)
+
+
+def emotions_batch(
+    key: Tuple[Tuple[int, float], int], texts: List[str]
+) -> List[List[Tuple[int, float]]]:
+    (top_k, threshold), _bucket = key
+    return emotions.detect_emotions_batch(texts, top_k, threshold)